@@ -0,0 +1,155 @@
+import contextlib
+import hashlib
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class Cache:
+    """
+    Persists lint responses across runs, keyed by a digest of the linted content.
+    Responses depend on more than the content (e.g. the domain or the project), which is why
+    each combination of those gets its own cache file, derived from the given namespace.
+    Additionally, the size and modification time of every linted file are remembered,
+    so that unchanged files neither need to be read nor hashed again.
+    """
+    DIRECTORY_NAME = "gitlab-lint"
+    DIGEST_SIZE = 16
+    FILES_KEY = "files"
+    RESPONSES_KEY = "responses"
+
+    def __init__(self, namespace: str):
+        name = hashlib.blake2b(namespace.encode("utf-8"), digest_size=self.DIGEST_SIZE).hexdigest()
+        self.path = cache_directory() / self.DIRECTORY_NAME / f"{name}.json"
+        self.lock = threading.Lock()
+        self.entries = self.load()
+        self.modified = False
+        # files looked up during this run, all others are dropped when saving after a complete run
+        self.seen = set()
+
+    def load(self) -> dict:
+        try:
+            with open(self.path, "rb") as file:
+                content = file.read()
+            entries = orjson.loads(content) if orjson is not None else json.loads(content)
+        except (OSError, ValueError):
+            # a missing or corrupt cache is simply rebuilt
+            entries = None
+        if not isinstance(entries, dict):
+            entries = {}
+        files = entries.get(self.FILES_KEY)
+        responses = entries.get(self.RESPONSES_KEY)
+        # malformed entries (e.g. from a truncated edit or another format) are dropped individually
+        return {
+            self.FILES_KEY: {path: entry for path, entry in files.items() if is_file_entry(entry)}
+            if isinstance(files, dict) else {},
+            self.RESPONSES_KEY: {digest: response for digest, response in responses.items()
+                                 if isinstance(response, dict)}
+            if isinstance(responses, dict) else {},
+        }
+
+    def get(self, digest: str) -> Union[None, dict]:
+        with self.lock:
+            response = self.entries[self.RESPONSES_KEY].get(digest)
+        # hand out copies, as responses are modified during postprocessing
+        return None if response is None else dict(response)
+
+    def put(self, digest: str, response: dict) -> None:
+        with self.lock:
+            self.entries[self.RESPONSES_KEY][digest] = dict(response)
+            self.modified = True
+
+    def get_file(self, filepath: str, stat: os.stat_result) -> Union[None, dict]:
+        """
+        :param filepath: file in question
+        :param stat: current stat result of that file
+        :return: the cached response, if the file has not changed since it was last linted
+        """
+        path = os.path.abspath(filepath)
+        with self.lock:
+            self.seen.add(path)
+            entry = self.entries[self.FILES_KEY].get(path)
+        if entry is None or entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+            return None
+        return self.get(entry["digest"])
+
+    def put_file(self, filepath: str, stat: os.stat_result, digest: str) -> None:
+        path = os.path.abspath(filepath)
+        entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "digest": digest}
+        with self.lock:
+            self.seen.add(path)
+            self.entries[self.FILES_KEY][path] = entry
+            self.modified = True
+
+    def prune(self) -> None:
+        """
+        Drops the entries of files that have not been looked up during this run,
+        as well as all responses that are no longer referenced by any file.
+        """
+        with self.lock:
+            files = {path: entry for path, entry in self.entries[self.FILES_KEY].items() if path in self.seen}
+            digests = {entry["digest"] for entry in files.values()}
+            responses = {digest: response for digest, response in self.entries[self.RESPONSES_KEY].items()
+                         if digest in digests}
+            if len(files) != len(self.entries[self.FILES_KEY]) or \
+                    len(responses) != len(self.entries[self.RESPONSES_KEY]):
+                self.entries = {self.FILES_KEY: files, self.RESPONSES_KEY: responses}
+                self.modified = True
+
+    def save(self, prune: bool = True) -> None:
+        """
+        Atomically replaces the cache file, so that concurrent or interrupted runs never leave a partial file behind.
+        :param prune: whether to prune the cache first, which requires all files of the run to have been looked up
+        """
+        if prune:
+            self.prune()
+        if not self.modified:
+            return
+        temporary_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        if orjson is not None:
+            content = orjson.dumps(self.entries)
+        else:
+            content = json.dumps(self.entries).encode("utf-8")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(temporary_path, "wb") as file:
+                file.write(content)
+            os.replace(temporary_path, self.path)
+        except OSError as error:
+            # the cache is only an optimization, so failing to persist it must not fail (or mask the outcome of) a run
+            print(f"Could not write the cache to '{self.path}': {error}", file=sys.stderr)
+            with contextlib.suppress(OSError):
+                os.remove(temporary_path)
+            return
+        self.modified = False
+
+    @classmethod
+    def digest(cls, content: bytes) -> str:
+        return hashlib.blake2b(content, digest_size=cls.DIGEST_SIZE).hexdigest()
+
+
+def is_file_entry(entry) -> bool:
+    """
+    :param entry: a loaded entry of the files index
+    :return: true if the entry has the expected shape
+    """
+    return isinstance(entry, dict) and isinstance(entry.get("mtime_ns"), int) and \
+        isinstance(entry.get("size"), int) and isinstance(entry.get("digest"), str)
+
+
+def cache_directory() -> Path:
+    """
+    :return: the user's cache directory, honoring XDG_CACHE_HOME
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    if cache_home:
+        return Path(cache_home)
+    return Path.home() / ".cache"
@@ -1,13 +1,39 @@
+import functools
+import os
 import re
-from glob import glob
-from pathlib import Path
+import sys
+import threading
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
 from typing import AnyStr
+from typing import FrozenSet
+from typing import Iterator
+from typing import List
 from typing import Tuple
 from typing import Union
 
 import click
-import requests
-import urllib3
+
+from gitlab_lint.Cache import Cache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_BACKTICK_RE = re.compile(r'`.+`')
+_INCLUDE_ITEM_RE = re.compile(r'\s*-')
+# directories that never hold ci configuration, but can be huge (hidden directories are skipped anyway)
+_EXCLUDED_DIRECTORIES = frozenset({"node_modules"})
+
+if sys.stdout.isatty():
+    _STRING_TEMPLATE = '\033[32m"%s"\033[0m'
+    _WARN_TEMPLATE = '\033[93m%s\033[0m'
+    _ERR_TEMPLATE = '\033[91m%s\033[0m'
+else:
+    # keep escape sequences out of CI logs and other captured output
+    _STRING_TEMPLATE = '"%s"'
+    _WARN_TEMPLATE = _ERR_TEMPLATE = '%s'
 
 
 class Linter:
@@ -18,17 +44,26 @@ class Linter:
     VALID_TAG = "valid"
     INVALID_TAG = "invalid"
     WARNING_TAG = "valid with warnings"
+    OK_STATUSES = frozenset({VALID_TAG, WARNING_TAG})
     CI_LINT_ENDPOINT = "/api/v4/ci/lint"
     PROJECT_PLACEHOLDER = ":id:"
     PROJECT_SPECIFIC_CI_LINT_ENDPOINT = f"/api/v4/projects/{PROJECT_PLACEHOLDER}/ci/lint"
     DEFAULT_FILE_NAME = ".gitlab-ci.yml"
     PLACE_HOLDER = "X"
+    DEFAULT_JOBS = 16
+    MAX_RETRIES = 3
+    RETRY_BACKOFF_FACTOR = 0.2
+    TIMEOUT = 30
+    JSON_HEADERS = {"Content-Type": "application/json"}
 
     SKIPPED_ERRORS = []
     SKIPPED_ERRORS_IF_INCLUDED = ["jobs config should contain at least one visible job"]
+    _SKIP_MAIN = frozenset(SKIPPED_ERRORS)
+    _SKIP_INCLUDED = frozenset(SKIPPED_ERRORS) | frozenset(SKIPPED_ERRORS_IF_INCLUDED)
 
     def __init__(self, domain: str, token: Union[None, str], path: Tuple[str], verify: bool, find_all: bool,
-                 skip_includes: bool, dry_run: bool, project_id: Union[None, str]):
+                 skip_includes: bool, dry_run: bool, project_id: Union[None, str], jobs: int = DEFAULT_JOBS,
+                 cache: bool = False, fail_fast: bool = False):
         self.domain = domain
         self.token = token
         self.path = path
@@ -37,54 +72,151 @@ class Linter:
         self.skip_includes = skip_includes
         self.dry_run = dry_run
         self.project_id = project_id
+        self.jobs = jobs
+        self.fail_fast = fail_fast
         self.data = {}
+        self.responses = {}
         self.exit_code = 0
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        if project_id is not None:
+            endpoint = self.PROJECT_SPECIFIC_CI_LINT_ENDPOINT.replace(self.PROJECT_PLACEHOLDER, project_id)
+        else:
+            endpoint = self.CI_LINT_ENDPOINT
+        self.url = f"https://{domain}{endpoint}"
+        # the response for a given content depends on all of these, the token included, as it determines access
+        self.cache = Cache(f"{self.url}|{token}|{skip_includes}|{dry_run}") if cache else None
+
+        # requests is only imported once it is needed, which keeps e.g. `gll --help` fast
+        import requests
+        import urllib3
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
         if not verify:
             # mask error message for not verifying https if verify is False
             urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        # a single session keeps the connection to gitlab alive across all linted files
+        self.session = requests.Session()
+        retries = Retry(total=self.MAX_RETRIES, backoff_factor=self.RETRY_BACKOFF_FACTOR)
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=jobs, max_retries=retries))
+        if token:
+            self.session.params = {'private_token': token}
+        # everything but the payload is the same for all requests of a run
+        self.post = functools.partial(self.session.post, self.url, verify=verify, timeout=self.TIMEOUT)
 
     def validate(self):
         if not self.find_all:
-            for filename in self.path:
-                self.process(filename)
+            filenames = list(self.path)
         else:
-            for directory in self.path:
-                files_with_leading_dot = glob(f"{directory}/**/.*.yml", recursive=True)
-                files_without_leading_dot = glob(f"{directory}/**/*.yml", recursive=True)
-                filenames = files_with_leading_dot + files_without_leading_dot
-                for filename in sorted(filenames):
-                    self.process(filename)
-
-    def process(self, filepath):
-        with open(filepath) as file:
-            content = file.read()
-            content = self.preprocess(content)
-            response = self.lint_remotely(content)
-            response = self.postprocess(response, filepath)
-            self.handle(response, filepath)
+            filenames = sorted({filename for directory in self.path for filename in iter_yml(directory)})
+        completed = False
+        try:
+            # linting is dominated by waiting for gitlab, so files are processed concurrently,
+            # while their output is still printed in order
+            workers = max(1, min(self.jobs, len(filenames)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(self.process, filename) for filename in filenames]
+                try:
+                    for future in futures:
+                        output, passed = future.result()
+                        if output:
+                            sys.stdout.write("\n".join(output) + "\n")
+                        if self.fail_fast and not passed:
+                            # all earlier files have been reported, so only later ones are skipped
+                            self.stopped.set()
+                            cancel(futures)
+                            break
+                except BaseException:
+                    # e.g. an api error or Ctrl-C, queued files must not keep the executor from shutting down
+                    cancel(futures)
+                    raise
+            completed = not self.stopped.is_set()
+        finally:
+            self.session.close()
+            if self.cache is not None:
+                # only a run that looked at every file knows which cache entries are stale
+                self.cache.save(prune=completed)
+
+    def process(self, filepath) -> Tuple[List[str], bool]:
+        """
+        Lints a single file.
+        :param filepath: file to be linted
+        :return: lines to be printed for this file (empty if skipped due to fail_fast) and whether it passed
+        """
+        output = []
+        if self.stopped.is_set():
+            # an earlier file has already been reported as invalid, so this one's result would not be shown
+            return output, True
+        if self.cache is not None:
+            response = self.lint_cached(filepath)
+        else:
+            raw_content = read_bytes(filepath)
+            response = self.lint_content(raw_content, Cache.digest(raw_content))
+        response = self.postprocess(response, filepath)
+        status = self.handle(response, filepath, output)
+        return output, status in self.OK_STATUSES
+
+    def lint_content(self, raw_content: bytes, digest: str) -> dict:
+        """
+        Lints the given content, sending identical contents to gitlab only once per run.
+        :param raw_content: content of the file to be linted
+        :param digest: digest of that content
+        :return: the response of the lint api
+        """
+        with self.lock:
+            future = self.responses.get(digest)
+            is_first = future is None
+            if is_first:
+                future = self.responses[digest] = Future()
+        if is_first:
+            try:
+                content = self.preprocess(raw_content.decode('utf-8'))
+                future.set_result(self.lint_remotely(content))
+            except BaseException as exception:
+                future.set_exception(exception)
+        # hand out copies, as responses are modified during postprocessing
+        return dict(future.result())
+
+    def lint_cached(self, filepath: str) -> dict:
+        """
+        Reuses responses of previous runs: files with unchanged size and modification time are not even read,
+        other files are only sent to gitlab, if their content is unknown.
+        :param filepath: file to be linted
+        :return: the (possibly cached) response of the lint api
+        """
+        stat = os.stat(filepath)
+        response = self.cache.get_file(filepath, stat)
+        if response is not None:
+            return response
+        raw_content = read_bytes(filepath)
+        digest = Cache.digest(raw_content)
+        response = self.cache.get(digest)
+        if response is None:
+            response = self.lint_content(raw_content, digest)
+            self.cache.put(digest, response)
+        self.cache.put_file(filepath, stat, digest)
+        return response
 
     def lint_remotely(self, content: AnyStr):
         """
             Sends the contents of filename to gitlab ci/lint api endpoint
             Reference: https://docs.gitlab.com/ee/api/lint.html
         """
-        params = {'private_token': self.token} if self.token else None
         json = {self.CONTENT_TAG: content}
-        if self.project_id is not None:
-            endpoint = self.PROJECT_SPECIFIC_CI_LINT_ENDPOINT
-            endpoint = endpoint.replace(self.PROJECT_PLACEHOLDER, self.project_id)
-        else:
-            endpoint = self.CI_LINT_ENDPOINT
-        url = f"https://{self.domain}{endpoint}"
-
         if self.dry_run:
             json.update({self.DRY_RUN_TAG: True})
-        response = requests.post(url, json=json, params=params, verify=self.verify)
+        if orjson is not None:
+            response = self.post(data=orjson.dumps(json), headers=self.JSON_HEADERS)
+        else:
+            response = self.post(json=json)
         if response.status_code != 200:
             raise click.ClickException(
                 f"API endpoint returned invalid response:\n"
                 f"{response.text}\n"
                 f"confirm your `domain` and `token` have been set correctly")
+        if orjson is not None:
+            return orjson.loads(response.content)
         return response.json()
 
     def preprocess(self, content: str) -> str:
@@ -98,38 +230,43 @@ class Linter:
             return response
 
         status = self.WARNING_TAG
+        should_be_skipped = self.should_be_skipped
         for error in response[self.ERROR_TAG]:
-            if not self.should_be_skipped(filepath, error):
+            if not should_be_skipped(filepath, error):
                 status = self.INVALID_TAG
+                break
         response[self.STATUS_TAG] = status
         return response
 
-    def handle(self, response: dict, filepath: str):
-        filename = Path(filepath).name
+    def handle(self, response: dict, filepath: str, output: List[str]) -> str:
+        filename = os.path.basename(filepath)
         if self.STATUS_TAG in response:
             status = response[self.STATUS_TAG]
         else:
             status = response[self.VALID_TAG]
-        print(f"{format_as_string(filepath)} is {status}")
+        output.append(f"{format_as_string(filepath)} is {status}")
+        is_warning = status == self.WARNING_TAG
+        log_error = self.log_error
         for error in response[self.ERROR_TAG]:
-            self.log_error(error, filename, status)
-        if status not in [self.VALID_TAG, self.WARNING_TAG]:
-            self.exit_code = 1
-        return response
+            log_error(error, filename, is_warning, output)
+        if status not in self.OK_STATUSES:
+            with self.lock:
+                self.exit_code = 1
+        return status
 
     def remove_includes(self, content: str) -> str:
-        if self.skip_includes:
-            lines = content.split("\n")
-            processed_lines = lines.copy()
+        # files without any include are returned as is, without splitting them into lines
+        if self.skip_includes and "include:" in content:
+            processed_lines = []
             include_block = False
-            for line in lines:
+            for line in content.split("\n"):
                 if "include:" in line:
-                    processed_lines.remove(line)
                     include_block = True
-                elif include_block and re.match(r'\s*-.*', line):
-                    processed_lines.remove(line)
+                elif include_block and _INCLUDE_ITEM_RE.match(line):
+                    continue
                 else:
                     include_block = False
+                    processed_lines.append(line)
             content = "\n".join(processed_lines)
         return content
 
@@ -140,12 +277,9 @@ class Linter:
         :param error: error message in question
         :return: true if the error in question should be skipped.
         """
-        skipped_errors = self.SKIPPED_ERRORS
-        if not filename.endswith(self.DEFAULT_FILE_NAME):
-            skipped_errors += self.SKIPPED_ERRORS_IF_INCLUDED
-        return re.sub(r'`.+`', self.PLACE_HOLDER, error) in skipped_errors
+        return _is_skipped(filename.endswith(self.DEFAULT_FILE_NAME), error)
 
-    def log_error(self, error: str, filename: str, status: str) -> None:
+    def log_error(self, error: str, filename: str, is_warning: bool, output: List[str]) -> None:
         """
         Gitlab ci/lint expects all files to be called the same.
         By replacing the default name with the actual file name,
@@ -153,35 +287,91 @@ class Linter:
 
         :param error: original error message
         :param filename: replaces the default name
-        :param status: kind of error, defined by tags
+        :param is_warning: whether the error is only a warning
+        :param output: lines to be printed, the error is appended to
         """
-        error = error.replace(self.DEFAULT_FILE_NAME, filename)
-        error = format_error(error, status == self.WARNING_TAG)
-        print(f"\t{error}")
+        if filename != self.DEFAULT_FILE_NAME:
+            error = error.replace(self.DEFAULT_FILE_NAME, filename)
+        error = format_error(error, is_warning)
+        output.append(f"\t{error}")
+
+
+@functools.lru_cache(maxsize=1024)
+def _is_skipped(is_default: bool, error: str) -> bool:
+    """
+    Memoized core of Linter.should_be_skipped, as the same errors tend to be reported for many files.
+    :param is_default: whether the error was reported for a .gitlab-ci.yml
+    :param error: error message in question
+    :return: true if the error in question should be skipped.
+    """
+    skipped_errors = Linter._SKIP_MAIN if is_default else Linter._SKIP_INCLUDED
+    return _BACKTICK_RE.sub(Linter.PLACE_HOLDER, error) in skipped_errors
+
+
+def cancel(futures: List[Future]) -> None:
+    """
+    Cancels all futures that have not been started yet.
+    :param futures: futures to be cancelled
+    """
+    for future in futures:
+        future.cancel()
+
+
+def read_bytes(filepath: str) -> bytes:
+    with open(filepath, 'rb') as file:
+        return file.read()
+
+
+def iter_yml(directory: str) -> Iterator[str]:
+    """
+    Walks the given directory recursively in a single pass.
+    Like glob's recursive `**`, it follows symlinked directories, so files reachable via several paths are
+    yielded for each of them, and it does not descend into hidden directories (e.g. .github or .tox), which
+    usually hold yml files that are not meant for gitlab. Unlike glob, symlink loops are not followed.
+    :param directory: root of the traversal
+    :return: paths of all .yml files, including those with a leading dot, outside of hidden or excluded directories
+    """
+    return _iter_yml(directory, frozenset())
+
+
+def _iter_yml(directory: str, ancestors: FrozenSet[str]) -> Iterator[str]:
+    # a directory that is its own ancestor was reached via a symlink loop, where glob would recurse until failing
+    real_path = os.path.realpath(directory)
+    if real_path in ancestors:
+        return
+    ancestors |= {real_path}
+    try:
+        entries = os.scandir(directory)
+    except OSError:
+        # unreadable directories are ignored, as glob does
+        return
+    with entries:
+        for entry in entries:
+            # DirEntry caches the file type from the directory listing, so this rarely needs a stat call
+            if entry.is_dir():
+                if not entry.name.startswith(".") and entry.name not in _EXCLUDED_DIRECTORIES:
+                    yield from _iter_yml(entry.path, ancestors)
+            elif entry.name.endswith(".yml") and entry.is_file():
+                yield entry.path
 
 
 def format_as_string(string: str):
     """
     Formats a given string in a different color using ANSI escape sequences
-    (see https://stackoverflow.com/a/287944/5299750) and adds double quotes
+    (see https://stackoverflow.com/a/287944/5299750) and adds double quotes.
+    Colors are omitted if stdout is not a terminal.
     :param string: to be printed
     """
-    ansi_start = '\033[32m'
-    ansi_end = '\033[0m'
-    return f"{ansi_start}\"{string}\"{ansi_end}"
+    return _STRING_TEMPLATE % string
 
 
 def format_error(string: str, is_warning: bool) -> str:
     """
     Formats a given message in an error color using ANSI escape sequences
     (see https://stackoverflow.com/a/287944/5299750
-    and https://stackoverflow.com/a/33206814/5299750)
+    and https://stackoverflow.com/a/33206814/5299750).
+    Colors are omitted if stdout is not a terminal.
     :param string: to be printed
     :param is_warning: determines the color of the error
     """
-    if is_warning:
-        ansi_start = '\033[93m'
-    else:
-        ansi_start = '\033[91m'
-    ansi_end = '\033[0m'
-    return f"{ansi_start}{string}{ansi_end}"
+    return (_WARN_TEMPLATE if is_warning else _ERR_TEMPLATE) % string
@@ -30,10 +30,17 @@ from gitlab_lint.Linter import Linter
               help="Run pipeline creation simulation or only do static check")
 @click.option("--project-id", "-id", envvar='CI_PROJECT_ID',
               help="Project id. You can set envvar CI_PROJECT_ID")
+@click.option("--jobs", "-j", default=Linter.DEFAULT_JOBS, show_default=True, type=click.IntRange(min=1),
+              help="Number of files that are linted concurrently")
+@click.option("--cache/--no-cache", default=False,
+              help="Reuse results of previous runs for files whose content has not changed. Note that changes to "
+                   "included files are not detected")
+@click.option("--fail-fast", default=False, is_flag=True,
+              help="Stop linting as soon as one file is invalid")
 def gll(domain: str, token: Union[None, str], path: Tuple[str], verify: bool, find_all: bool, skip_includes: bool,
-        dry_run: bool, project_id: Union[None, str]):
+        dry_run: bool, project_id: Union[None, str], jobs: int, cache: bool, fail_fast: bool):
     validate_arguments(find_all, path, dry_run, project_id)
-    linter = Linter(domain, token, path, verify, find_all, skip_includes, dry_run, project_id)
+    linter = Linter(domain, token, path, verify, find_all, skip_includes, dry_run, project_id, jobs, cache, fail_fast)
     linter.validate()
     sys.exit(linter.exit_code)
 
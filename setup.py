@@ -17,7 +17,8 @@ setup(
     long_description_content_type="text/markdown",
     download_url="https://github.com/christian-steinmeyer/gitlab-lint/archive/0.2.4.tar.gz",
     keywords=['GITLAB', 'LINT', 'GIT'],
-    packages=find_packages(),
+    packages=find_packages(exclude=['tests']),
+    test_suite='tests',
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
@@ -28,6 +29,9 @@ setup(
         'Click',
         'Requests'
     ],
+    extras_require={
+        'fast': ['orjson']
+    },
     entry_points='''
         [console_scripts]
         gll=gitlab_lint.gll:gll
@@ -0,0 +1,82 @@
+import contextlib
+import io
+import os
+import tempfile
+import time
+import unittest
+from collections import namedtuple
+from unittest import mock
+
+import click
+
+from gitlab_lint import Linter as linter_module
+from gitlab_lint.Linter import Linter
+
+Run = namedtuple("Run", ["linter", "lines", "lint_calls", "reads"])
+
+
+def lint_remotely(content: str) -> dict:
+    """
+    Stands in for the gitlab api: content containing "slow" takes a while, content containing "invalid" is invalid,
+    content containing "hidden" has no visible job and content containing "error" is rejected by the api.
+    """
+    if "error" in content:
+        raise click.ClickException("API endpoint returned invalid response")
+    if "hidden" in content:
+        return {"status": "invalid", "errors": ["jobs config should contain at least one visible job"]}
+    if "slow" in content:
+        time.sleep(0.2)
+    if "invalid" in content:
+        return {"status": "invalid", "errors": ["broken"]}
+    return {"status": "valid", "errors": []}
+
+
+class LinterTestCase(unittest.TestCase):
+    """
+    Runs the linter on files within a temporary directory, which also serves as XDG_CACHE_HOME,
+    with the lint api stubbed by lint_remotely.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        environment = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": os.path.join(self.directory.name, "cache")})
+        environment.start()
+        self.addCleanup(environment.stop)
+
+    def write(self, name: str, content: str) -> str:
+        """
+        :param name: path relative to the temporary directory, missing parent directories are created
+        :param content: to be written
+        :return: the path of the written file
+        """
+        path = os.path.join(self.directory.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(content)
+        return path
+
+    @staticmethod
+    def create_linter(*paths: str, **options) -> Linter:
+        """
+        :param paths: files to be linted
+        :param options: keyword arguments of Linter, overriding the defaults of gll
+        """
+        arguments = dict(domain="gitlab.com", token=None, verify=False, find_all=False, skip_includes=False,
+                         dry_run=False, project_id=None)
+        arguments.update(options)
+        return Linter(path=paths, **arguments)
+
+    def run_linter(self, *paths: str, **options) -> Run:
+        """
+        Lints the given files, counting how many of them were sent to gitlab and how many were read.
+        :param options: further keyword arguments of Linter
+        :return: the linter, the printed lines and both counts
+        """
+        linter = self.create_linter(*paths, **options)
+        stdout = io.StringIO()
+        with mock.patch.object(Linter, "lint_remotely", side_effect=lint_remotely) as lint_calls, \
+                mock.patch.object(linter_module, "read_bytes", wraps=linter_module.read_bytes) as reads, \
+                contextlib.redirect_stdout(stdout):
+            linter.validate()
+        return Run(linter, stdout.getvalue().splitlines(), lint_calls.call_count, reads.call_count)
@@ -0,0 +1,84 @@
+import contextlib
+import io
+import json
+import os
+import unittest
+from unittest import mock
+
+import click
+
+from gitlab_lint.Cache import Cache
+from tests import LinterTestCase
+
+
+class CacheTest(LinterTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.first = self.write("first.yml", "first: 1")
+        self.second = self.write("second.yml", "second: 2")
+
+    def lint(self, *paths: str):
+        """
+        :return: number of remote lint calls and number of files read
+        """
+        run = self.run_linter(*paths, cache=True)
+        self.assertEqual(0, run.linter.exit_code)
+        return run.lint_calls, run.reads
+
+    def cached_entries(self) -> dict:
+        return self.create_linter(cache=True).cache.entries
+
+    def test_unchanged_files_are_neither_read_nor_linted(self):
+        self.assertEqual((2, 2), self.lint(self.first, self.second))
+        self.assertEqual((0, 0), self.lint(self.first, self.second))
+
+    def test_touched_files_with_known_content_are_read_but_not_linted(self):
+        self.lint(self.first, self.second)
+        stat = os.stat(self.first)
+        os.utime(self.first, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual((0, 1), self.lint(self.first, self.second))
+
+    def test_changed_files_are_linted(self):
+        self.lint(self.first, self.second)
+        self.write("second.yml", "second: 3")
+        self.assertEqual((1, 1), self.lint(self.first, self.second))
+
+    def test_entries_of_files_not_linted_are_dropped(self):
+        self.lint(self.first, self.second)
+        self.lint(self.first)
+        entries = self.cached_entries()
+        self.assertEqual([os.path.abspath(self.first)], list(entries[Cache.FILES_KEY]))
+        self.assertEqual(1, len(entries[Cache.RESPONSES_KEY]))
+        self.assertEqual((1, 1), self.lint(self.first, self.second))
+
+    def test_entries_are_kept_if_the_run_is_aborted(self):
+        self.lint(self.first, self.second)
+        with self.assertRaises(click.ClickException):
+            self.run_linter(self.write("broken.yml", "error: 3"), self.first, cache=True, jobs=1)
+        self.assertEqual((0, 0), self.lint(self.first, self.second))
+
+    def test_malformed_entries_are_treated_as_misses(self):
+        self.lint(self.first, self.second)
+        cache = self.create_linter(cache=True).cache
+        with open(cache.path) as file:
+            entries = json.load(file)
+        del entries[Cache.FILES_KEY][os.path.abspath(self.first)]["mtime_ns"]
+        entries[Cache.FILES_KEY][os.path.abspath(self.second)] = "garbage"
+        with open(cache.path, "w") as file:
+            json.dump(entries, file)
+        # both contents are still known, so the files only need to be read again
+        self.assertEqual((0, 2), self.lint(self.first, self.second))
+        self.assertEqual((0, 0), self.lint(self.first, self.second))
+
+    def test_unwritable_cache_does_not_fail_the_run(self):
+        # a file where the cache directory should be makes creating it fail
+        blocked = self.write("blocked", "")
+        stderr = io.StringIO()
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": blocked}), contextlib.redirect_stderr(stderr):
+            self.assertEqual((2, 2), self.lint(self.first, self.second))
+        self.assertIn("Could not write the cache", stderr.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import click
+
+from gitlab_lint.Cache import Cache
+from gitlab_lint.Linter import Linter
+from gitlab_lint.Linter import format_as_string
+from tests import LinterTestCase
+
+
+class DeduplicationTest(LinterTestCase):
+
+    def test_identical_contents_are_linted_once(self):
+        first = self.write("first.yml", "valid: 1")
+        second = self.write("second.yml", "valid: 1")
+        third = self.write("third.yml", "valid: 3")
+        self.assertEqual(2, self.run_linter(first, second, third, jobs=3).lint_calls)
+
+    def test_files_with_identical_content_are_postprocessed_independently(self):
+        # the same error is skipped for an included file, but not for a .gitlab-ci.yml
+        main = self.write(".gitlab-ci.yml", "hidden: 1")
+        included = self.write("included.yml", "hidden: 1")
+        run = self.run_linter(main, included, jobs=2)
+        self.assertEqual(1, run.lint_calls)
+        reports = [line for line in run.lines if not line.startswith("\t")]
+        self.assertEqual([f"{format_as_string(main)} is invalid",
+                          f"{format_as_string(included)} is valid with warnings"], reports)
+
+    def test_responses_are_copies(self):
+        linter = self.create_linter()
+        content = b"valid: 1"
+        with mock.patch.object(Linter, "lint_remotely", return_value={"status": "valid", "errors": []}):
+            first = linter.lint_content(content, Cache.digest(content))
+            first["status"] = "modified"
+            second = linter.lint_content(content, Cache.digest(content))
+        self.assertEqual("valid", second["status"])
+
+    def test_error_of_first_caller_reaches_waiting_caller(self):
+        linter = self.create_linter()
+        content = b"valid: 1"
+        started = threading.Event()
+        release = threading.Event()
+
+        def lint_remotely(_):
+            started.set()
+            release.wait(5)
+            raise click.ClickException("API endpoint returned invalid response")
+
+        with mock.patch.object(Linter, "lint_remotely", side_effect=lint_remotely) as lint_calls, \
+                ThreadPoolExecutor(max_workers=2) as executor:
+            first = executor.submit(linter.lint_content, content, Cache.digest(content))
+            self.assertTrue(started.wait(5))
+            # the second caller finds the pending request of the first one and waits for it
+            second = executor.submit(linter.lint_content, content, Cache.digest(content))
+            release.set()
+            for future in [first, second]:
+                with self.assertRaises(click.ClickException):
+                    future.result(5)
+        self.assertEqual(1, lint_calls.call_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import os
+import unittest
+
+from gitlab_lint.Linter import iter_yml
+from tests import LinterTestCase
+
+
+class IterYmlTest(LinterTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.root = os.path.join(self.directory.name, "root")
+        for name in [".gitlab-ci.yml", "sub/a.yml", "sub/b.yaml", "sub/c.txt", "named.yml/d.yml", "other/o.yml",
+                     ".github/workflows/ci.yml", ".gitlab/ci/e.yml", "node_modules/package/f.yml"]:
+            self.write(os.path.join("root", name), "")
+        os.symlink(os.path.join("..", "other"), os.path.join(self.root, "sub", "link"))
+        os.symlink(self.root, os.path.join(self.root, "sub", "loop"))
+
+    def test_finds_yml_files_like_glob(self):
+        expected = [".gitlab-ci.yml", "named.yml/d.yml", "other/o.yml", "sub/a.yml", "sub/link/o.yml"]
+        self.assertEqual([os.path.join(self.root, *name.split("/")) for name in expected],
+                         sorted(iter_yml(self.root)))
+
+
+if __name__ == '__main__':
+    unittest.main()
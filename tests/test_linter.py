@@ -0,0 +1,68 @@
+import os
+import unittest
+from unittest import mock
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from gitlab_lint.Linter import format_as_string
+from tests import LinterTestCase
+
+
+class FailFastTest(LinterTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # the first file takes longest, so later files finish (and fail) before it is reported
+        self.paths = [self.write("f1.yml", "slow: valid"), self.write("f2.yml", "invalid: 2"),
+                      self.write("f3.yml", "valid: 3"), self.write("f4.yml", "invalid: 4")]
+
+    def reports(self, **options):
+        run = self.run_linter(*self.paths, jobs=4, **options)
+        return run.linter.exit_code, [line for line in run.lines if not line.startswith("\t")]
+
+    def expected_report(self, index: int, status: str) -> str:
+        return f"{format_as_string(self.paths[index])} is {status}"
+
+    def test_reports_up_to_first_invalid_file_in_order(self):
+        self.assertEqual((1, [self.expected_report(0, "valid"), self.expected_report(1, "invalid")]),
+                         self.reports(fail_fast=True))
+
+    def test_stopping_early_keeps_cache_of_skipped_files(self):
+        self.reports(cache=True)
+        self.assertEqual((1, [self.expected_report(0, "valid"), self.expected_report(1, "invalid")]),
+                         self.reports(cache=True, fail_fast=True))
+        self.assertEqual(0, self.run_linter(*self.paths, cache=True).lint_calls)
+
+    def test_reports_all_files_without_fail_fast(self):
+        self.assertEqual((1, [self.expected_report(0, "valid"), self.expected_report(1, "invalid"),
+                              self.expected_report(2, "valid"), self.expected_report(3, "invalid")]),
+                         self.reports(fail_fast=False))
+
+
+class VerifyTest(LinterTestCase):
+
+    def send(self, adapter: HTTPAdapter, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        self.verify.append(kwargs["verify"])
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{"status": "valid", "errors": []}'
+        return response
+
+    def lint(self, verify: bool):
+        self.verify = []
+        linter = self.create_linter(self.write("file.yml", "valid: 1"), verify=verify)
+        with mock.patch.object(HTTPAdapter, "send", autospec=True, side_effect=self.send), \
+                mock.patch.dict(os.environ, {"REQUESTS_CA_BUNDLE": "/some/ca-bundle.crt"}):
+            linter.lint_remotely("valid: 1")
+        return self.verify
+
+    def test_disabled_verification_is_not_overridden_by_environment(self):
+        self.assertEqual([False], self.lint(verify=False))
+
+    def test_enabled_verification_uses_ca_bundle_from_environment(self):
+        self.assertEqual(["/some/ca-bundle.crt"], self.lint(verify=True))
+
+
+if __name__ == '__main__':
+    unittest.main()